@@ -1,16 +1,39 @@
 # scripts/feature_store.py
 import os
+import csv
 import json
+import queue
+import atexit
 import argparse
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+import numpy as np
 import pandas as pd
+from sqlite_tuning import apply_pragmas
+
+try:
+    import adbc_driver_sqlite.dbapi as adbc
+except ImportError:  # optional: Arrow transport, falls back to sqlite3
+    adbc = None
 
 DB_PATH = "data/customer_churn.db"
 TABLE = "customers_transformed"
 CATALOG_JSON = "feature_store/metadata.json"
 CATALOG_EXPORT = "reports/feature_catalog.csv"
 OUT_DIR = "data/feature_sets"
+PREVIEW_ROWS = 5
+READ_POOL_SIZE = os.cpu_count() or 4
+# Online lookups with at least this many IDs go through ADBC (Arrow pays off on large results)
+ARROW_MIN_IDS = 10_000
+
+# db_path -> queue of idle read-only connections
+_READ_POOLS = {}
+
+# catalog dtype -> pandas dtype
+CATALOG_DTYPES = {"float": "float64", "int": "Int64", "string": "string"}
 
 os.makedirs("reports", exist_ok=True)
 os.makedirs(OUT_DIR, exist_ok=True)
@@ -21,60 +44,127 @@ def _load_catalog():
     with open(CATALOG_JSON, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def _connect():
-    if not os.path.exists(DB_PATH):
-        raise FileNotFoundError(f"Missing DB at {DB_PATH}. Run Stage 6 first.")
-    return sqlite3.connect(DB_PATH)
-
-def _table_columns(conn, table):
-    cur = conn.cursor()
-    cur.execute(f"PRAGMA table_info({table});")
-    cols = [r[1] for r in cur.fetchall()]
-    return cols
+def _connect(db_path=DB_PATH):
+    """Open a read-only connection; the single writer lives in transform_store."""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Missing DB at {db_path}. Run Stage 6 first.")
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    apply_pragmas(conn, readonly=True)
+    return conn
+
+@contextmanager
+def _reader(db_path=DB_PATH):
+    """Borrow a read-only connection from the pool; it is returned (or closed if the pool is full)."""
+    pool = _READ_POOLS.setdefault(db_path, queue.LifoQueue(maxsize=READ_POOL_SIZE))
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _connect(db_path)
+    try:
+        yield conn
+    finally:
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+@atexit.register
+def _close_pools():
+    for pool in _READ_POOLS.values():
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+@lru_cache(maxsize=8)
+def _cached_table_columns(db_path, table, mtime):
+    """PRAGMA lookup; mtime is part of the key so a rewritten DB misses the cache."""
+    with _reader(db_path) as conn:
+        cur = conn.cursor()
+        cur.execute(f"PRAGMA table_info({table});")
+        return tuple(r[1] for r in cur.fetchall())
+
+def _table_columns(db_path, table):
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Missing DB at {db_path}. Run Stage 6 first.")
+    return _cached_table_columns(db_path, table, os.path.getmtime(db_path))
 
 def cmd_register(args):
     """Validate metadata against DB and export human-readable catalog CSV."""
     catalog = _load_catalog()
-    conn = _connect()
-    try:
-        cols = _table_columns(conn, TABLE)
-        rows = []
-        for f in catalog["features"]:
-            name = f["name"]
-            present = "yes" if name in cols else "no"
-            rows.append({
-                "feature": name,
-                "dtype": f.get("dtype", ""),
-                "entity": f.get("entity", ""),
-                "version": f.get("version", ""),
-                "source_table": f.get("source_table", ""),
-                "in_db": present,
-                "description": f.get("description", "")
-            })
-        df = pd.DataFrame(rows)
-        df.to_csv(CATALOG_EXPORT, index=False)
-        print(f"✅ Catalog exported → {CATALOG_EXPORT}")
-        print(df)
-    finally:
-        conn.close()
+    cols = _table_columns(DB_PATH, TABLE)
+    rows = []
+    for f in catalog["features"]:
+        name = f["name"]
+        present = "yes" if name in cols else "no"
+        rows.append({
+            "feature": name,
+            "dtype": f.get("dtype", ""),
+            "entity": f.get("entity", ""),
+            "version": f.get("version", ""),
+            "source_table": f.get("source_table", ""),
+            "in_db": present,
+            "description": f.get("description", "")
+        })
+    df = pd.DataFrame(rows)
+    df.to_csv(CATALOG_EXPORT, index=False)
+    print(f"✅ Catalog exported → {CATALOG_EXPORT}")
+    print(df)
 
 def cmd_list(args):
     """List available features (metadata + DB presence)."""
     catalog = _load_catalog()
-    conn = _connect()
-    try:
-        cols = set(_table_columns(conn, TABLE))
-        for f in catalog["features"]:
-            flag = "✓" if f["name"] in cols else "✗"
-            print(f"{flag} {f['name']} (v{f.get('version','')}) — {f.get('description','')}")
-    finally:
-        conn.close()
+    cols = set(_table_columns(DB_PATH, TABLE))
+    for f in catalog["features"]:
+        flag = "✓" if f["name"] in cols else "✗"
+        print(f"{flag} {f['name']} (v{f.get('version','')}) — {f.get('description','')}")
 
 def _validate_features(requested, available_cols):
     missing = [f for f in requested if f not in available_cols]
     if missing:
         raise ValueError(f"Requested features not in table '{TABLE}': {missing}")
 
+def _catalog_dtypes():
+    """Feature name -> pandas dtype from the catalog; empty if metadata.json is missing."""
+    if not os.path.exists(CATALOG_JSON):
+        return {}
+    return {f["name"]: CATALOG_DTYPES[f["dtype"]]
+            for f in _load_catalog()["features"] if f.get("dtype") in CATALOG_DTYPES}
+
+def _apply_dtypes(df, dtypes):
+    """Cast columns to their catalog dtype; keep the stored type if an int cast would be lossy."""
+    for col in df.columns:
+        if col not in dtypes:
+            continue
+        target = dtypes[col]
+        if target == "Int64" and pd.api.types.is_float_dtype(df[col].dtype):
+            vals = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            if not np.all(np.isnan(vals) | (vals == np.floor(vals))):
+                continue  # e.g. scaled tenure stored as REAL
+        df[col] = df[col].astype(target)
+    return df
+
+def _fetch_frame(db_path, sql, params, columns, arrow=False):
+    """Fetch a query result as a DataFrame without going through pd.read_sql.
+
+    With arrow=True and ADBC installed, the result comes back as Arrow buffers
+    (no per-value Python objects); otherwise the frame is built from the raw
+    tuples of a pooled sqlite3 reader, which is cheaper for small results.
+    """
+    if arrow and adbc is not None:
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Missing DB at {db_path}. Run Stage 6 first.")
+        with adbc.connect(f"file:{db_path}?mode=ro") as c, c.cursor() as cur:
+            apply_pragmas(cur, readonly=True)
+            cur.execute(sql, list(params))
+            tbl = cur.fetch_arrow_table()
+        return tbl.to_pandas(types_mapper=pd.ArrowDtype)
+
+    with _reader(db_path) as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return pd.DataFrame.from_records(rows, columns=columns)
+
 def cmd_training(args):
     """Build offline training set CSV for the requested features (+ label if included)."""
     feats = args.features
@@ -82,21 +172,24 @@ def cmd_training(args):
         raise ValueError("Provide at least one feature via --features")
 
     entity_id = "customerID"
-    conn = _connect()
-    try:
-        cols = _table_columns(conn, TABLE)
+    with _reader() as conn:
+        cols = _table_columns(DB_PATH, TABLE)
         # ensure entity id always included
         requested = [entity_id] + feats
         _validate_features(requested, cols)
 
-        df = pd.read_sql(f"SELECT {', '.join(requested)} FROM {TABLE}", conn)
+        # stream rows from the cursor straight to CSV (no DataFrame)
+        cur = conn.execute(f"SELECT {', '.join(requested)} FROM {TABLE}")
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         out = os.path.join(OUT_DIR, f"training_{ts}.csv")
-        df.to_csv(out, index=False)
+        with open(out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(requested)
+            preview = list(islice(cur, PREVIEW_ROWS))
+            writer.writerows(preview)
+            writer.writerows(cur)
         print(f"✅ Training set created → {out}")
-        print(df.head())
-    finally:
-        conn.close()
+        print(pd.DataFrame.from_records(preview, columns=requested))
 
 def cmd_online(args):
     """Fetch online features for given customer IDs."""
@@ -108,34 +201,29 @@ def cmd_online(args):
         raise ValueError("Provide one or more customer IDs via --ids")
 
     entity_id = "customerID"
-    conn = _connect()
-    try:
-        cols = _table_columns(conn, TABLE)
-        requested = [entity_id] + feats
-        _validate_features(requested, cols)
-
-        # parameterized query
-        placeholders = ", ".join(["?"] * len(ids))
-        sql = f"SELECT {', '.join(requested)} FROM {TABLE} WHERE {entity_id} IN ({placeholders})"
-        df = pd.read_sql(sql, conn, params=ids)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        out = os.path.join(OUT_DIR, f"online_{ts}.csv")
-        df.to_csv(out, index=False)
-        print(f"✅ Online features saved → {out}")
-        print(df)
-    finally:
-        conn.close()
+    dtypes = _catalog_dtypes()
+    cols = _table_columns(DB_PATH, TABLE)
+    requested = [entity_id] + feats
+    _validate_features(requested, cols)
+
+    # parameterized query (served by the customerID index)
+    placeholders = ", ".join(["?"] * len(ids))
+    sql = f"SELECT {', '.join(requested)} FROM {TABLE} WHERE {entity_id} IN ({placeholders})"
+    df = _fetch_frame(DB_PATH, sql, ids, requested, arrow=len(ids) >= ARROW_MIN_IDS)
+    df = _apply_dtypes(df, dtypes)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out = os.path.join(OUT_DIR, f"online_{ts}.csv")
+    df.to_csv(out, index=False)
+    print(f"✅ Online features saved → {out}")
+    print(df)
 
 def cmd_sample_ids(args):
     """Show sample customer IDs from the table to help test 'online'."""
     n = args.limit
     entity_id = "customerID"
-    conn = _connect()
-    try:
-        df = pd.read_sql(f"SELECT {entity_id} FROM {TABLE} LIMIT {n};", conn)
-        print(df[entity_id].tolist())
-    finally:
-        conn.close()
+    with _reader() as conn:
+        rows = conn.execute(f"SELECT {entity_id} FROM {TABLE} LIMIT ?;", (n,)).fetchall()
+    print([r[0] for r in rows])
 
 def main():
     parser = argparse.ArgumentParser(description="Simple Feature Store CLI")
@@ -1,7 +1,8 @@
 import os
-import requests
+import asyncio
+import aiohttp
 import logging
-import pandas as pd
+import pyarrow.csv as pv
 from datetime import datetime
 from kaggle.api.kaggle_api_extended import KaggleApi
 
@@ -35,18 +36,31 @@ logging.basicConfig(
     format="%(asctime)s :: %(levelname)s :: %(message)s"
 )
 
-def ingest_git():
+# Download chunk size (bytes) for the streamed GitHub fetch
+CHUNK_SIZE = 64 * 1024
+
+async def ingest_git():
+    filename = f"telecom_churn_github_{datetime.now().strftime('%Y%m%d')}.csv"
+    filepath = os.path.join(RAW_PATH, filename)
+    part_path = filepath + ".part"
     try:
-        response = requests.get(API_SOURCE_1, timeout=30)
-        response.raise_for_status()
-        filename = f"telecom_churn_github_{datetime.now().strftime('%Y%m%d')}.csv"
-        filepath = os.path.join(RAW_PATH, filename)
-        with open(filepath, "wb") as f:
-            f.write(response.content)
+        # per-socket timeouts, like requests' timeout=30 (not a cap on the whole download)
+        timeout = aiohttp.ClientTimeout(sock_connect=30, sock_read=30)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(API_SOURCE_1) as response:
+                response.raise_for_status()
+                # stream to a .part file; only one chunk is held in memory and a
+                # dropped connection never leaves a truncated CSV under the final name
+                with open(part_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        f.write(chunk)
+        os.replace(part_path, filepath)
         logging.info(f"SUCCESS - Ingested from GitHub → {filepath}")
         print(f"[✔] GitHub ingestion complete → {filename}")
         return filepath
     except Exception as e:
+        if os.path.exists(part_path):
+            os.remove(part_path)
         logging.error(f"GitHub ingestion FAILED: {e}")
         print("[✘] GitHub ingestion failed:", str(e))
         return None
@@ -69,18 +83,21 @@ def ingest_kaggle():
         print("[✘] Kaggle ingestion failed:", str(e))
         return None
 
+async def ingest_all():
+    """Run both sources concurrently; the Kaggle client is blocking, so it gets a thread."""
+    return await asyncio.gather(ingest_git(), asyncio.to_thread(ingest_kaggle))
+
 if __name__ == "__main__":
     print("\nIngesting Telecom Churn data from 2 sources...\n")
 
-    f1 = ingest_git()
-    f2 = ingest_kaggle()
+    f1, f2 = asyncio.run(ingest_all())
 
     # Quick verification
     if f1 and os.path.exists(f1):
-        df1 = pd.read_csv(f1)
+        df1 = pv.read_csv(f1)
         print(" GitHub dataset shape:", df1.shape)
     if f2 and os.path.exists(f2):
-        df2 = pd.read_csv(f2)
+        df2 = pv.read_csv(f2)
         print(" Kaggle dataset shape:", df2.shape)
 
     print(f"\n📂 All ingested files + logs saved in: {RAW_PATH}")
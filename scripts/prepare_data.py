@@ -1,5 +1,7 @@
-import os, glob
+import os, json
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.preprocessing import StandardScaler
@@ -18,32 +20,64 @@ os.makedirs(EDA_PATH, exist_ok=True)
 # ----------------------------
 # 1. Pick the latest ingested CSV
 # ----------------------------
-files = glob.glob(f"{RAW_PATH}/**/*.csv", recursive=True)
-if not files:
+def latest_csv(root):
+    """Newest *.csv under root (walks the source/year/month/day partitions), one stat per file."""
+    best_mtime, best_path = -1.0, None
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with it:
+            for e in it:
+                if e.name.startswith("."):
+                    continue  # glob("**/*.csv") skipped hidden entries (e.g. .ipynb_checkpoints)
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.name.endswith(".csv"):
+                    m = e.stat().st_mtime
+                    if m > best_mtime:
+                        best_mtime, best_path = m, e.path
+    return best_path
+
+latest_file = latest_csv(RAW_PATH)
+if latest_file is None:
     raise FileNotFoundError("❌ No raw CSVs found. Run ingestion + storage first.")
 
-latest_file = max(files, key=os.path.getmtime)
 print(f"📂 Using latest raw dataset: {latest_file}")
 
-df = pd.read_csv(latest_file)
-
-# --- After loading df ---
-
+# Multi-threaded Arrow parser. TotalCharges/tenure are read as strings so a malformed
+# value becomes NaN in the coerce step below instead of failing the whole read.
+tbl = pv.read_csv(
+    latest_file,
+    read_options=pv.ReadOptions(block_size=8 << 20),
+    convert_options=pv.ConvertOptions(
+        column_types={"TotalCharges": pa.string(), "tenure": pa.string()},
+        null_values=["", " ", "NA", "NaN", "null"],
+        strings_can_be_null=True,
+    ),
+)
+df = tbl.to_pandas()
 
 # Coerce numeric columns early (so they won't be treated as categorical)
 for col in ["tenure", "MonthlyCharges", "TotalCharges", "SeniorCitizen"]:
     if col in df.columns:
         df[col] = pd.to_numeric(df[col], errors="coerce")
 
-# Drop duplicates
-df.drop_duplicates(inplace=True)
-
-# Handle missing values
-for col in df.select_dtypes(include=[np.number]).columns:
-    df[col] = df[col].fillna(df[col].median())
+# Drop duplicates: customerID is the entity key, so compare that one column;
+# without it, dedup on a single 64-bit hash per row instead of all columns
+if "customerID" in df.columns:
+    df = df.drop_duplicates(subset=["customerID"], ignore_index=True)
+else:
+    row_hash = pd.util.hash_pandas_object(df, index=False)
+    df = df[~row_hash.duplicated().to_numpy()].reset_index(drop=True)
 
-for col in df.select_dtypes(include=["object"]).columns:
-    df[col] = df[col].fillna(df[col].mode()[0])
+# Handle missing values: medians for numeric, modes for text, in one fillna
+num_fill = df.select_dtypes(include=[np.number]).median().to_dict()
+obj_mode = df.select_dtypes(include=["object"]).mode()
+obj_fill = obj_mode.iloc[0].to_dict() if not obj_mode.empty else {}  # no text columns/rows
+df.fillna({**num_fill, **obj_fill}, inplace=True)
 
 # Map Churn to 0/1 and DO NOT one-hot it
 if "Churn" in df.columns and df["Churn"].dtype == "object":
@@ -63,23 +97,22 @@ cat_cols = [c for c in cat_cols if c in df.columns]
 exclude = {"customerID","Churn"}
 cat_cols = [c for c in cat_cols if c not in exclude]
 
-# One-hot encode ONLY these known categoricals
-df = pd.get_dummies(df, columns=cat_cols, drop_first=True)
+# One-hot encode ONLY these known categoricals (dense uint8: the Yes/No dummies are
+# ~30-50% ones, so sparse storage would cost more than it saves)
+df = pd.get_dummies(df, columns=cat_cols, drop_first=True, dtype=np.uint8)
 
-# (Optional) scale numeric features except the label
-from sklearn.preprocessing import StandardScaler
-num_cols = [c for c in df.select_dtypes(include=[np.number]).columns if c != "Churn"]
-scaler = StandardScaler()
-df[num_cols] = scaler.fit_transform(df[num_cols])
+# Record the *_Yes flags here, where they are created, for Stage 6 (NumAddons)
+yes_cols = [c for c in df.columns if c.endswith("_Yes")]
 
 # ----------------------------
 # 4. Scale numerical features
 # ----------------------------
-scaler = StandardScaler()
+# scale once, in place on a float32 copy of the numeric block
+scaler = StandardScaler(copy=False)
 num_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
 num_cols = [c for c in num_cols if c != "Churn"]  # skip target
 
-df[num_cols] = scaler.fit_transform(df[num_cols])
+df[num_cols] = scaler.fit_transform(df[num_cols].to_numpy(dtype=np.float32))
 
 # ----------------------------
 # 5. Save cleaned dataset
@@ -88,6 +121,10 @@ clean_file = os.path.join(CLEAN_PATH, "cleaned_churn.csv")
 df.to_csv(clean_file, index=False)
 print(f"💾 Clean dataset saved → {clean_file}")
 
+yes_cols_file = os.path.join(CLEAN_PATH, "yes_cols.json")
+with open(yes_cols_file, "w", encoding="utf-8") as f:
+    json.dump(yes_cols, f, indent=2)
+
 # ----------------------------
 # 6. EDA plots
 # ----------------------------
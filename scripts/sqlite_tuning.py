@@ -0,0 +1,22 @@
+# scripts/sqlite_tuning.py
+"""Shared SQLite connection tuning for transform_store (writer) and feature_store (readers).
+
+journal_mode=WAL is persistent in the DB file. In WAL mode every connection, including
+the mode=ro readers, keeps customer_churn.db-wal / customer_churn.db-shm next to the DB
+while it is open (SQLite may leave them behind); both are ignored by git and DVC.
+"""
+
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA cache_size=-20000;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",
+]
+
+def apply_pragmas(conn, readonly=False):
+    """Run SQLITE_PRAGMAS via conn.execute (a connection or cursor); journal_mode is skipped on read-only ones."""
+    for pragma in SQLITE_PRAGMAS:
+        if readonly and pragma.startswith("PRAGMA journal_mode"):
+            continue
+        conn.execute(pragma)
@@ -1,19 +1,28 @@
 # scripts/transform_store.py
 import os
 import sys
-import glob
+import json
+import hashlib
+import inspect
 import logging
 from datetime import datetime
 import sqlite3
 import pandas as pd
 import numpy as np
+from sqlite_tuning import apply_pragmas
 
 # ----------------------------
 # CONFIG & FOLDERS
 # ----------------------------
 CLEAN_INPUT_DIR = "data/clean"                 # from Stage 5
-TRANS_OUT_DIR   = "data/transformed"           # transformed CSV output
+YES_COLS_JSON   = "data/clean/yes_cols.json"   # *_Yes one-hot columns, from Stage 5
+TRANS_OUT_DIR   = "data/transformed"           # transformed Parquet output
 DB_PATH         = "data/customer_churn.db"     # SQLite DB path
+CACHE_DIR       = "data/cache"                 # engineered features keyed by input hash
+CACHE_KEEP      = 5                            # most recently used cache entries to keep
+
+# Bump when feature semantics change in a way the source hash can't see (e.g. data files)
+FEATURES_VERSION = "1"
 REPORTS_DIR     = "reports"
 LOGS_DIR        = "logs"
 
@@ -21,6 +30,7 @@ LOGS_DIR        = "logs"
 MAX_SQLITE_COLS = 950
 
 os.makedirs(TRANS_OUT_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
 os.makedirs(LOGS_DIR, exist_ok=True)
 
@@ -34,13 +44,75 @@ logging.basicConfig(
 # UTILS
 # ----------------------------
 def _latest_clean_csv():
-    candidates = glob.glob(os.path.join(CLEAN_INPUT_DIR, "*.csv"))
-    if not candidates:
+    # one scandir pass, one stat per file (no separate glob + getmtime)
+    best_mtime, best_path = -1.0, None
+    if os.path.isdir(CLEAN_INPUT_DIR):
+        with os.scandir(CLEAN_INPUT_DIR) as it:
+            for e in it:
+                if e.name.endswith(".csv") and not e.name.startswith(".") and e.is_file():
+                    m = e.stat().st_mtime
+                    if m > best_mtime:
+                        best_mtime, best_path = m, e.path
+    if best_path is None:
         raise FileNotFoundError(
             f"No cleaned CSVs found under {CLEAN_INPUT_DIR}/. "
             "Run Stage 5 (prepare_data) first."
         )
-    return max(candidates, key=os.path.getmtime)
+    return best_path
+
+def _load_yes_cols():
+    """*_Yes column list recorded by Stage 5, or None if it was not written."""
+    if not os.path.exists(YES_COLS_JSON):
+        return None
+    with open(YES_COLS_JSON, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _cache_key(src, yes_cols):
+    """Hash of the cleaned input, the *_Yes list and the feature code that produced the output."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(FEATURES_VERSION.encode("utf-8"))
+    for fn in (engineer_features, _safe_div, _to_numeric_safe):
+        h.update(inspect.getsource(fn).encode("utf-8"))
+    with open(src, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(json.dumps(yes_cols).encode("utf-8"))
+    return h.hexdigest()
+
+def _prune_cache(keep=CACHE_KEEP):
+    """Drop all but the `keep` most recently used cache entries."""
+    with os.scandir(CACHE_DIR) as it:
+        entries = [e for e in it if e.name.endswith(".parquet") and e.is_file()]
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for e in entries[keep:]:
+        os.remove(e.path)
+
+def _read_cache(cache_path):
+    """Cached features, or None on a miss; an unreadable entry is dropped and counts as a miss."""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        df = pd.read_parquet(cache_path)
+    except Exception as e:
+        logging.warning(f"Feature cache unreadable, recomputing | {cache_path} | {e}")
+        os.remove(cache_path)
+        return None
+    os.utime(cache_path)  # mark as recently used for pruning
+    return df
+
+def _write_cache(df, cache_path):
+    """Write to a .part file and rename, so a killed run never leaves a truncated entry."""
+    part_path = cache_path + ".part"
+    try:
+        df.to_parquet(part_path, engine="pyarrow", index=False)
+        os.replace(part_path, cache_path)
+        _prune_cache()
+    except Exception as e:
+        logging.warning(f"Feature cache write failed, continuing without it | {cache_path} | {e}")
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return
+    logging.info(f"Feature cache miss | wrote {cache_path}")
 
 def _to_numeric_safe(series):
     """Coerce to numeric, set invalid to NaN."""
@@ -51,20 +123,17 @@ def _safe_div(a, b):
         out = np.where(b == 0, np.nan, a / b)
     return out
 
-def _infer_sql_type(dtype):
-    """Map pandas dtype to SQLite column type."""
-    if pd.api.types.is_integer_dtype(dtype):
-        return "INTEGER"
-    if pd.api.types.is_float_dtype(dtype):
-        return "REAL"
-    if pd.api.types.is_bool_dtype(dtype):
-        return "INTEGER"
-    return "TEXT"
+# numpy dtype.kind -> SQLite column type (anything else is TEXT)
+SQL_TYPE_BY_KIND = {"i": "INTEGER", "u": "INTEGER", "f": "REAL", "b": "INTEGER"}
+
+def _sql_types(df):
+    """Map each column's pandas dtype to an SQLite column type, in column order."""
+    return [SQL_TYPE_BY_KIND.get(dtype.kind, "TEXT") for dtype in df.dtypes]
 
 # ----------------------------
 # FEATURE ENGINEERING
 # ----------------------------
-def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
+def engineer_features(df: pd.DataFrame, yes_cols: list = None) -> pd.DataFrame:
     df = df.copy()
 
     # Ensure ID & label exist in a sane format
@@ -99,16 +168,25 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
 
     # TenureGroup buckets
     if "tenure" in df.columns:
-        bins = [-np.inf, 6, 12, 24, 48, np.inf]
-        labels = ["0-6", "7-12", "13-24", "25-48", "48+"]
-        df["TenureGroup"] = pd.cut(df["tenure"], bins=bins, labels=labels)
+        # right-closed edges like pd.cut: side="left" puts 6 in "0-6", 7 in "7-12"
+        edges = np.array([6, 12, 24, 48], dtype=np.float64)
+        labels = np.array(["0-6", "7-12", "13-24", "25-48", "48+", None], dtype=object)
+        tenure = df["tenure"].to_numpy(dtype=np.float64, na_value=np.nan)
+        idx = np.searchsorted(edges, tenure, side="left")
+        idx[np.isnan(tenure)] = len(labels) - 1  # missing tenure -> no group
+        df["TenureGroup"] = labels[idx]
     else:
         df["TenureGroup"] = "Unknown"
 
-    # NumAddons: count *_Yes flags (typical after one-hot)
-    yes_cols = [c for c in df.columns if c.endswith("_Yes")]
+    # NumAddons: count *_Yes flags (typical after one-hot); scan only if Stage 5 didn't record them
+    if yes_cols is None:
+        yes_cols = [c for c in df.columns if c.endswith("_Yes")]
+    else:
+        yes_cols = [c for c in yes_cols if c in df.columns]
     if yes_cols:
-        df["NumAddons"] = df[yes_cols].sum(axis=1).astype(float)
+        # one contiguous uint8 block summed in NumPy (no wide float64 intermediate)
+        flags = df[yes_cols].to_numpy(dtype=np.uint8, copy=False)
+        df["NumAddons"] = flags.sum(axis=1, dtype=np.uint16).astype(np.float32)
     else:
         df["NumAddons"] = 0.0
 
@@ -130,28 +208,46 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
 # ----------------------------
 # DB WRITE + SCHEMA/QUERIES
 # ----------------------------
+def _quote_ident(name):
+    """Double-quote an SQLite identifier (one-hot columns contain spaces/parens)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
 def write_sqlite(df: pd.DataFrame, db_path: str, table_name: str = "customers_transformed"):
-    conn = sqlite3.connect(db_path)
+    # Single read/write connection; feature_store reads through mode=ro connections.
+    # Autocommit mode so the explicit BEGIN/COMMIT below is the only transaction.
+    conn = sqlite3.connect(f"file:{db_path}?mode=rwc", uri=True, isolation_level=None)
     try:
-        # Write table
-        df.to_sql(table_name, conn, if_exists="replace", index=False)
-
-        # Add basic indexes (customerID, label if present)
-        cur = conn.cursor()
-        if "customerID" in df.columns:
-            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_customerID ON {table_name}(customerID);")
-        if "Churn" in df.columns:
-            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_churn ON {table_name}(Churn);")
-        conn.commit()
+        apply_pragmas(conn)
+
+        table = _quote_ident(table_name)
+        cols_sql = ", ".join(f"{_quote_ident(c)} {t}" for c, t in zip(df.columns, _sql_types(df)))
+        placeholders = "(" + ", ".join(["?"] * len(df.columns)) + ")"
+
+        # Take the write lock once for drop/create/insert/index
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            conn.execute(f"DROP TABLE IF EXISTS {table};")
+            conn.execute(f"CREATE TABLE {table} ({cols_sql});")
+            conn.executemany(
+                f"INSERT INTO {table} VALUES {placeholders};",
+                df.itertuples(index=False, name=None),
+            )
+
+            # Add basic indexes (customerID, label if present)
+            if "customerID" in df.columns:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_customerID ON {table}(customerID);")
+            if "Churn" in df.columns:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_churn ON {table}(Churn);")
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
     finally:
         conn.close()
 
 def write_schema_file(df: pd.DataFrame, out_path: str, table_name: str = "customers_transformed"):
     lines = [f"DROP TABLE IF EXISTS {table_name};", f"CREATE TABLE {table_name} ("]
-    cols_sql = []
-    for col in df.columns:
-        sql_type = _infer_sql_type(df[col].dtype)
-        cols_sql.append(f"  {col} {sql_type}")
+    cols_sql = [f"  {col} {sql_type}" for col, sql_type in zip(df.columns, _sql_types(df))]
     lines.append(",\n".join(cols_sql))
     lines.append(");")
     schema_sql = "\n".join(lines)
@@ -215,10 +311,17 @@ def main():
         print(f"Using cleaned input: {src}")
         logging.info(f"Stage6 start | source={src}")
 
-        df = pd.read_csv(src)
-        before_shape = df.shape
-
-        df_tr = engineer_features(df)
+        yes_cols = _load_yes_cols()
+        cache_path = os.path.join(CACHE_DIR, f"{_cache_key(src, yes_cols)}.parquet")
+        df_tr = _read_cache(cache_path)
+        if df_tr is not None:
+            # Same input as a previous run: skip parsing + feature engineering
+            print(f"Using cached features: {cache_path}")
+            logging.info(f"Feature cache hit | {cache_path}")
+        else:
+            df = pd.read_csv(src)
+            df_tr = engineer_features(df, yes_cols=yes_cols)
+            _write_cache(df_tr, cache_path)
 
         # --- Column cap to satisfy SQLite limits ---
         base_keep = [
@@ -251,10 +354,10 @@ def main():
         after_shape = df_tr.shape
         print("Final transformed shape:", after_shape)
 
-        # Persist transformed CSV
+        # Persist transformed data as Parquet (typed, columnar; no re-parse on reload)
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_csv = os.path.join(TRANS_OUT_DIR, f"transformed_customers_{ts}.csv")
-        df_tr.to_csv(out_csv, index=False)
+        out_parquet = os.path.join(TRANS_OUT_DIR, f"transformed_customers_{ts}.parquet")
+        df_tr.to_parquet(out_parquet, engine="pyarrow", compression="snappy", index=False)
 
         # Write to SQLite
         write_sqlite(df_tr, DB_PATH, table_name="customers_transformed")
@@ -271,9 +374,9 @@ def main():
         engineered = [c for c in ["TotalSpend", "AvgMonthlySpend", "TenureGroup", "NumAddons"] if c in df_tr.columns]
         write_summary(summary_path, os.path.basename(src), after_shape[0], after_shape[1], engineered)
 
-        logging.info(f"Stage6 complete | out_csv={out_csv} | db={DB_PATH} | rows={after_shape[0]} cols={after_shape[1]}")
+        logging.info(f"Stage6 complete | out_parquet={out_parquet} | db={DB_PATH} | rows={after_shape[0]} cols={after_shape[1]}")
         print("✅ Stage 6 complete")
-        print("  • CSV  →", out_csv)
+        print("  • PQ   →", out_parquet)
         print("  • DB   →", DB_PATH, "(table: customers_transformed)")
         print("  • SQL  →", schema_path, "and", queries_path)
         print("  • Note →", summary_path)
@@ -1,6 +1,11 @@
 import os
+import csv
 import glob
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
 import logging
 
 # ----------------
@@ -22,29 +27,81 @@ logging.basicConfig(
 # ----------------
 # VALIDATION
 # ----------------
+def _open_reader(file_path, names):
+    """Streaming Arrow reader with every column read as a string (nulls allowed)."""
+    return pv.open_csv(
+        file_path,
+        read_options=pv.ReadOptions(block_size=8 << 20),
+        convert_options=pv.ConvertOptions(
+            column_types={name: pa.string() for name in names},
+            strings_can_be_null=True,
+        ),
+    )
+
+def _row_hashes(df):
+    """Vectorized 64-bit hash per row."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def _confirm_duplicates(file_path, names, candidates):
+    """Exact duplicate count among rows whose hash occurs more than once (re-read only if any)."""
+    parts = []
+    for batch in _open_reader(file_path, names):
+        df = batch.to_pandas()
+        mask = np.isin(_row_hashes(df), candidates)
+        if mask.any():
+            parts.append(df[mask])
+    return int(pd.concat(parts).duplicated().sum()) if parts else 0
+
 def validate_csv(file_path):
+    """Run all checks over one streaming pyarrow scan of the data.
+
+    The header line is read separately for the column names, and a second scan
+    happens only when duplicate-hash candidates need confirming.
+    """
     issues = []
     try:
-        df = pd.read_csv(file_path)
-
-        # Required columns
-        if "customerID" not in df.columns:
+        # Read every column as a string: open_csv would otherwise fix the types from the
+        # first block and abort the whole file on one later mismatching value.
+        with open(file_path, "r", newline="", encoding="utf-8") as f:
+            names = next(csv.reader(f), [])
+        reader = _open_reader(file_path, names)
+        schema = reader.schema
+
+        # Required columns (from the header, no data scan)
+        if "customerID" not in schema.names:
             issues.append("Missing column: customerID")
-        if "Churn" not in df.columns:
+        if "Churn" not in schema.names:
             issues.append("Missing column: Churn")
 
-        # Missing values
-        nulls = df.isnull().sum().sum()
+        # Missing values + row hashes, accumulated per batch (8 bytes per row kept)
+        nulls = 0
+        hashes = []
+        # tenure is integer only if every value is present and parses as an int
+        tenure_int = "tenure" in schema.names
+        for batch in reader:
+            nulls += sum(col.null_count for col in batch.columns)
+            if tenure_int:
+                tenure = batch.column("tenure")
+                is_int = pc.match_substring_regex(tenure, r"^\s*[+-]?\d+\s*$")
+                tenure_int = tenure.null_count == 0 and pc.all(is_int).as_py() is not False
+            hashes.append(_row_hashes(batch.to_pandas()))
+
+        # Duplicates: rows sharing a hash are only candidates; they are confirmed
+        # by comparing the actual rows, so a hash collision is never reported.
+        dups = 0
+        if hashes:
+            uniq, counts = np.unique(np.concatenate(hashes), return_counts=True)
+            candidates = uniq[counts > 1]
+            if candidates.size:
+                dups = _confirm_duplicates(file_path, names, candidates)
+
         if nulls > 0:
             issues.append(f"Contains {nulls} missing values")
-
-        # Duplicates
-        dups = df.duplicated().sum()
         if dups > 0:
             issues.append(f"Contains {dups} duplicate rows")
 
         # Data types (example check)
-        if "tenure" in df.columns and not pd.api.types.is_integer_dtype(df["tenure"]):
+        if "tenure" in schema.names and not tenure_int:
             issues.append("Column tenure should be integer")
 
     except Exception as e: